@@ -15,6 +15,7 @@ Features:
 - Interactive mode for URL selection
 - Sitemap-based crawling
 - Table of contents generation (PDF)
+- Concurrent downloads with a per-host request delay
 
 Usage Examples:
 --------------
@@ -47,14 +48,20 @@ Dependencies:
 - beautifulsoup4: For HTML parsing
 - reportlab: For PDF generation
 - Pillow: For image processing
+- lxml: For fast HTML and XML parsing (falls back to html.parser if missing)
 - (optional) python-docx: For DOCX output
-- (optional) lxml: For XML parsing
+- (optional) html2text: For structured Markdown output
+- (optional) pyahocorasick: For faster keyword filtering
+- (optional) orjson: For faster JSON output
+- (optional) selectolax: For faster text and link extraction
 
 Author: Created with assistance from Claude AI
 Date: March 2025
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import os
 import io
@@ -63,12 +70,24 @@ import re
 import logging
 import time
 import argparse
+import functools
+import gzip
+import html
 import json
+import random
+import shelve
+import sqlite3
 import sys
-from urllib.parse import urljoin, urlparse
+import threading
+from contextlib import contextmanager, nullcontext
+from itertools import repeat
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Preformatted, PageBreak
 from reportlab.platypus.tableofcontents import TableOfContents
 from reportlab.lib.units import inch
@@ -78,17 +97,196 @@ from PIL import Image as PILImage
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Prefer lxml (C-based) for HTML and sitemap XML, fall back to the standard library
+try:
+    from lxml import etree
+    HTML_PARSER = 'lxml'
+except ImportError:
+    import xml.etree.ElementTree as etree
+    HTML_PARSER = 'html.parser'
+
+# Optional: pyahocorasick finds any of several filter keywords in a single pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional: orjson writes the JSON output much faster than the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: html2text turns the page HTML into structured Markdown
+try:
+    import html2text
+except ImportError:
+    html2text = None
+
+# Optional: selectolax (lexbor backend) extracts page text and links much faster than BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Links to these file types are never crawled
+SKIPPED_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.zip', '.exe', '.json', '.xml', '.js', '.css')
+
+# Turn a page title (Markdown) or a URL (HTML) into an anchor name in a single pass
+ANCHOR_TABLE = str.maketrans({' ': '-', ':': '', '.': '', '/': '-'})
+URL_ANCHOR_TABLE = str.maketrans('/', '_')
+
+# Output formats that read the serialized HTML / the plain text of each page
+# (Markdown is converted from the HTML when html2text is available)
+if html2text:
+    HTML_FORMATS = ('html', 'md', 'markdown')
+    TEXT_FORMATS = ('json', 'docx')
+else:
+    HTML_FORMATS = ('html',)
+    TEXT_FORMATS = ('json', 'md', 'markdown', 'docx')
+
+# Query parameters that only track where a visitor came from (besides utm_*)
+TRACKING_PARAMS = frozenset({'fbclid', 'gclid', 'msclkid'})
+
+# Markup around the page text: scripts, style sheets, comments and tags. Removing it
+# from raw HTML (and decoding entities) gives about the text the HTML parser extracts.
+MARKUP_RE = re.compile(r'<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->|<[!?/]?[a-zA-Z][^>]*>',
+                       re.IGNORECASE | re.DOTALL)
+
+# "Sitemap: <url>" directives in robots.txt
+SITEMAP_DIRECTIVE_RE = re.compile(r'^\s*sitemap\s*:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+
+# Elements of the main content that are turned into PDF flowables
+CONTENT_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'p', 'pre', 'code', 'img', 'div'})
+
+# Image formats reportlab can embed as-is, identified by their magic bytes
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF8', '.gif'),
+)
+
+# Larger images are re-encoded through PIL instead of being copied verbatim
+MAX_PASSTHROUGH_SIZE = 5 * 1024 * 1024
+
+# Image downloads are aborted once they exceed this size
+MAX_IMAGE_SIZE = 8 * 1024 * 1024
+
+# Slow page downloads are hedged with a second request past the host's 95th percentile
+# response time, once this many responses were measured, for at most 1 in HEDGE_RATIO requests
+HEDGE_MIN_SAMPLES = 20
+HEDGE_RATIO = 100
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_url(url):
+    """Cached urlparse; navigation and footer links repeat on every page of a site"""
+    return urlparse(url)
+
+
+@functools.lru_cache(maxsize=8192)
+def canonical_url(url):
+    """Normalizes a URL so different spellings of the same page are crawled once:
+    lowercase scheme and host, no fragment, no tracking parameters, sorted query"""
+    parts = urlsplit(url)
+    query = parts.query
+    if query:
+        # Sort the raw key=value segments without decoding them, so the server gets
+        # the parameters exactly as they were written (%20 stays %20, ?print stays ?print)
+        params = []
+        for param in query.split('&'):
+            key = param.partition('=')[0]
+            if param and not key.startswith('utm_') and key not in TRACKING_PARAMS:
+                params.append(param)
+        query = '&'.join(sorted(params))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+
+def keyword_scanner(contains, not_contains):
+    """Builds a function that scans a lowercase text once and returns a tuple telling
+    whether it contains any of the required and any of the excluded keywords"""
+    if ahocorasick:
+        # One automaton for both lists; each keyword maps to the lists it belongs to
+        automaton = ahocorasick.Automaton()
+        for keyword in set(contains) | set(not_contains):
+            automaton.add_word(keyword, (keyword in contains, keyword in not_contains))
+        automaton.make_automaton()
+        
+        def scan(text):
+            found_required = found_excluded = False
+            for _, (required, excluded) in automaton.iter(text):
+                found_required = found_required or required
+                found_excluded = found_excluded or excluded
+                # Stop as soon as nothing more can be learned from the text
+                if (found_required or not contains) and (found_excluded or not not_contains):
+                    break
+            return found_required, found_excluded
+        return scan
+    
+    return lambda text: (any(keyword in text for keyword in contains),
+                         any(keyword in text for keyword in not_contains))
+
+
+def robots_crawl_delay(robots_txt, user_agent):
+    """Returns the robots.txt Crawl-delay for the user agent in seconds, or None.
+    
+    Parsed here because urllib.robotparser ignores fractional values like 0.5.
+    Agents are matched like urllib.robotparser does: a group applies if its name
+    occurs in the product token of the user agent, '*' applies to every agent.
+    """
+    product = user_agent.split('/')[0].lower()
+    delays = {}  # User-agent name -> Crawl-delay of its group
+    agents = []
+    in_rules = False
+    for line in robots_txt.splitlines():
+        field, _, value = line.partition('#')[0].partition(':')
+        field = field.strip().lower()
+        value = value.strip()
+        if field == 'user-agent':
+            # A User-agent line after rules starts a new group
+            if in_rules:
+                agents = []
+                in_rules = False
+            agents.append(value.lower())
+        elif field:
+            in_rules = True
+            if field == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                if not 0 <= delay < float('inf'):
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+    
+    for agent, delay in delays.items():
+        if agent != '*' and agent in product:
+            return delay
+    return delays.get('*')
+
+
+def guess_image_extension(data):
+    """Returns the file extension for PNG, JPEG or GIF data, or None for anything else"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return None
+
 class WebToPdfConverter:
     def __init__(self, base_url, output_path, options=None):
+        base_url = canonical_url(base_url)
         self.base_url = base_url
         self.output_path = output_path
         self.domain = urlparse(base_url).netloc
         self.base_path = urlparse(base_url).path.rsplit('/', 1)[0] + '/'
         self.temp_dir = tempfile.mkdtemp()
         self.image_counter = 0
-        self.pdf_elements = []
+        self.img_cache = {}  # Absolute image URL -> downloaded file path (None if it failed)
+        self._image_lock = threading.Lock()
         self.visited_urls = set()
-        self.to_visit = [base_url]
+        self.to_visit = deque([base_url])
+        self.queued_urls = {base_url}  # Every URL ever added to to_visit, for O(1) membership checks
         self.contents = {}  # Store page content for non-PDF formats
         
         # Default options
@@ -104,41 +302,356 @@ class WebToPdfConverter:
             'contains': None,
             'not_contains': None,
             'create_toc': False,
-            'interactive': False
+            'interactive': False,
+            'workers': 16,
+            'max_per_host': 4,
+            'max_bytes': 5 * 1024 * 1024,
+            'respect_robots': False,
+            'cache': True,
+            'cache_dir': os.path.join(os.path.expanduser('~'), '.cache', 'web_to_doc'),
+            'cache_ttl': 24,
+            'resume': True
         }
         
         # Update with custom options
         if options:
             self.options.update(options)
         
+        # Content filter keywords, parsed once per run, and a scanner checking both lists
+        # in a single pass (None when no filter is set)
+        self._contains_keywords, self._not_contains_keywords = (
+            [k.lower().strip() for k in (self.options[option] or '').split(',') if k.strip()]
+            for option in ('contains', 'not_contains')
+        )
+        self._keyword_scanner = None
+        if self._contains_keywords or self._not_contains_keywords:
+            self._keyword_scanner = keyword_scanner(self._contains_keywords, self._not_contains_keywords)
+        
         # URL depth for max_depth tracking
         self.url_depth = {base_url: 0}
         
         # Sitemap URLs, if used
         self.sitemap_urls = []
+        self._sitemap_cache = {}  # Host -> discovered sitemap URLs
+        self._robots_txt = {}  # Origin -> robots.txt content ('' if there is none)
+        self._robots_rules = {}  # Origin -> parsed robots.txt (only with respect_robots)
+        self._crawl_delays = {}  # Origin -> robots.txt Crawl-delay in seconds (None if there is none)
+        self._robots_lock = threading.Lock()
+        
+        # PDF styles for the various page elements, shared by all pages
+        self._style_title = ParagraphStyle('Title', fontSize=16, spaceAfter=12)
+        self._style_url = ParagraphStyle('URL', fontSize=8, textColor=colors.gray, spaceAfter=12)
+        self._style_header = ParagraphStyle('Header', fontSize=14, spaceAfter=8, spaceBefore=12)
+        self._style_text = ParagraphStyle('Text', fontSize=10, spaceAfter=8, leading=14)
+        self._style_code = ParagraphStyle('Code', fontName='Courier', fontSize=8, spaceAfter=8, 
+                                          backColor=colors.lightgrey, borderWidth=1, borderColor=colors.lightgrey,
+                                          borderPadding=5, leading=12)
+        
+        # Shared HTTP session so all requests reuse keep-alive connections
+        self.session = requests.Session()
+        # Transient server errors and rate limiting (429, honouring Retry-After) are retried
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+        })
+        
+        # Worker pools for concurrent downloads; images get their own pool so they
+        # don't queue behind page fetches waiting for their per-host slot
+        self.executor = ThreadPoolExecutor(max_workers=max(1, self.options['workers']))
+        self.image_executor = ThreadPoolExecutor(max_workers=max(1, self.options['workers']))
+        
+        # Earliest time the next request to each host may start (per-host politeness);
+        # downloads wait on the condition until their host is ready and has a free slot
+        self._host_next_ok = {}
+        self._host_lock = threading.Lock()
+        self._host_ready = threading.Condition(self._host_lock)
+        
+        # Number of requests in flight to each host, capped at max_per_host
+        self._host_active = {}
+        
+        # Recent response times per host and the start time of each running page request, for hedging
+        self._host_latency = {}
+        self._request_started = {}
+        self._page_requests = 0
+        self._hedged_requests = 0
+        self.hedge_executor = ThreadPoolExecutor(max_workers=2)
+        
+        # On-disk page cache (url -> body, ETag, Last-Modified, download time). Entries
+        # younger than cache_ttl hours are used as-is, older ones are re-validated.
+        self._cache = None
+        self._cache_lock = threading.Lock()
+        if self.options['cache']:
+            cache_path = os.path.join(self.options['cache_dir'], 'pages')
+            try:
+                os.makedirs(self.options['cache_dir'], exist_ok=True)
+                self._cache = shelve.open(cache_path)
+            except Exception as e:
+                logger.warning(f"Page cache disabled, could not open {cache_path}: {e}")
+        
+        # Resume log next to the output file: the pages the crawl has downloaded, so an
+        # interrupted run restarts without loading them again. Opened when the crawl
+        # starts and removed once it has visited every page.
+        self._state = None
+        self._state_path = os.fspath(output_path) + '.state.sqlite'
+        self._state_uncommitted = 0
     
-    def download_page(self, url):
-        """Downloads a webpage and returns the HTML content"""
+    def download_page(self, url, hedge=False):
+        """Downloads a webpage and returns the HTML content (hedge: a second request for a slow page)"""
+        # Recently downloaded pages are served from the cache without a request
+        cached = self.get_cached_page(url)
+        if cached and time.time() - cached.get('fetched_at', 0) < self.options['cache_ttl'] * 3600:
+            logger.info(f"Using cached copy: {url}")
+            return cached['body']
+        
         try:
             logger.info(f"Loading page: {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=self.options['timeout'])
-            response.raise_for_status()
             
-            # Check the Content-Type of the response
-            content_type = response.headers.get('Content-Type', '').lower()
-            if 'text/html' not in content_type and 'application/xhtml+xml' not in content_type:
-                logger.warning(f"Skipping non-HTML content: {url} (Content-Type: {content_type})")
-                return None
+            # Ask the server to skip the body if our cached copy is still current
+            headers = {}
+            if cached:
+                if cached['etag']:
+                    headers['If-None-Match'] = cached['etag']
+                if cached['last_modified']:
+                    headers['If-Modified-Since'] = cached['last_modified']
+            
+            max_bytes = self.options['max_bytes']
+            with self.page_connection(url, hedge), \
+                    self.session.get(url, headers=headers, stream=True, timeout=self.options['timeout']) as response:
+                if cached and response.status_code == 304:
+                    logger.info(f"Not modified, using cached copy: {url}")
+                    self.cache_page(url, cached['body'], cached['etag'], cached['last_modified'])
+                    return cached['body']
+                response.raise_for_status()
+                
+                # Check the Content-Type of the response before reading the body
+                content_type = response.headers.get('Content-Type', '').lower()
+                if 'text/html' not in content_type and 'application/xhtml+xml' not in content_type:
+                    logger.warning(f"Skipping non-HTML content: {url} (Content-Type: {content_type})")
+                    return None
+                
+                # Pages the server announces as too large are skipped without reading any
+                # of the body (compressed bodies only grow when they are decoded)
+                content_length = response.headers.get('Content-Length', '')
+                if content_length.isdigit() and int(content_length) > max_bytes:
+                    logger.warning(f"Skipping page larger than {max_bytes} bytes: {url}")
+                    return None
+                
+                # Read the body in chunks so oversized pages are dropped early
+                body = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    body += chunk
+                    if len(body) > max_bytes:
+                        logger.warning(f"Skipping page larger than {max_bytes} bytes: {url}")
+                        return None
                 
-            return response.text
+                try:
+                    html_content = body.decode(response.encoding or 'utf-8', errors='replace')
+                except LookupError:
+                    # Unknown charset in the Content-Type header
+                    html_content = body.decode('utf-8', errors='replace')
+                
+            self.cache_page(url, html_content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return html_content
         except requests.exceptions.RequestException as e:
             logger.error(f"Error loading page {url}: {e}")
-            return None    def is_valid_url(self, url, from_url=None):
+            return None
+    
+    def get_cached_page(self, url):
+        """Returns the cached entry for a URL, or None if the page isn't cached"""
+        with self._cache_lock:
+            if self._cache is None:
+                return None
+            return self._cache.get(url)
+    
+    def cache_page(self, url, body, etag, last_modified):
+        """Stores a downloaded page with its validators for conditional requests"""
+        with self._cache_lock:
+            if self._cache is not None:
+                self._cache[url] = {'etag': etag, 'last_modified': last_modified, 'body': body,
+                                    'fetched_at': time.time()}
+    
+    def open_state(self):
+        """Opens the resume log, continuing an interrupted crawl unless resume is off"""
+        if not self.options['resume']:
+            self.remove_state()
+        try:
+            self._state = sqlite3.connect(self._state_path)
+            self._state.execute('PRAGMA journal_mode=WAL')
+            self._state.execute('PRAGMA synchronous=NORMAL')
+            self._state.execute('CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, body TEXT)')
+            resumed_pages = self._state.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+            if resumed_pages:
+                logger.info(f"Resuming: {resumed_pages} pages were already downloaded ({self._state_path})")
+        except sqlite3.Error as e:
+            logger.warning(f"Resume log disabled, could not open {self._state_path}: {e}")
+            self._state = None
+    
+    def close_state(self, finished):
+        """Closes the resume log; a finished crawl leaves nothing to resume, so its log is deleted"""
+        if self._state is None:
+            return
+        self._state.commit()
+        self._state.close()
+        self._state = None
+        if finished:
+            self.remove_state()
+    
+    def stored_page(self, url):
+        """Returns the body of a page downloaded by an interrupted run, or None"""
+        if self._state is None:
+            return None
+        row = self._state.execute('SELECT body FROM pages WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+    
+    def store_page(self, url, body):
+        """Adds a downloaded page to the resume log, committing every 32 pages"""
+        if self._state is None:
+            return
+        self._state.execute('INSERT OR REPLACE INTO pages (url, body) VALUES (?, ?)', (url, body))
+        self._state_uncommitted += 1
+        if self._state_uncommitted >= 32:
+            self._state.commit()
+            self._state_uncommitted = 0
+    
+    def remove_state(self):
+        """Deletes the resume log (and the SQLite write-ahead log files next to it)"""
+        for path in (self._state_path, self._state_path + '-wal', self._state_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def host_delay(self, url):
+        """Returns the delay between requests to the URL's host (raised to its robots.txt Crawl-delay)"""
+        delay = self.options['delay']
+        if self.options['respect_robots']:
+            parsed = parse_url(url)
+            origin = f"{parsed.scheme}://{parsed.netloc}"
+            if origin not in self._crawl_delays:
+                self._crawl_delays[origin] = robots_crawl_delay(self.fetch_robots_txt(origin),
+                                                                self.session.headers['User-Agent'])
+            crawl_delay = self._crawl_delays[origin]
+            if crawl_delay:
+                delay = max(delay, crawl_delay)
+        return delay
+    
+    @contextmanager
+    def host_connection(self, url, delayed=False):
+        """Holds one of the host's max_per_host request slots while the request is in flight.
+        
+        With delayed (page downloads), the slot is only taken once the host is also ready
+        for the next request, and that start time is claimed with it. The time is claimed
+        when the request really starts, so a download that finishes in the meantime and
+        pushes the host's next start further out is respected, and a download sleeping
+        out the delay doesn't keep image downloads from using the slot.
+        """
+        host = parse_url(url).netloc
+        delay = self.host_delay(url) if delayed else 0
+        max_per_host = max(1, self.options['max_per_host'])
+        with self._host_ready:
+            while True:
+                now = time.monotonic()
+                next_ok = self._host_next_ok.get(host, now) if delayed else now
+                if next_ok > now:
+                    self._host_ready.wait(next_ok - now)
+                elif self._host_active.get(host, 0) >= max_per_host:
+                    # Woken up when a request to any host finishes
+                    self._host_ready.wait()
+                else:
+                    break
+            self._host_active[host] = self._host_active.get(host, 0) + 1
+            if delayed:
+                self._host_next_ok[host] = now + delay
+        
+        try:
+            yield
+        finally:
+            with self._host_ready:
+                self._host_active[host] -= 1
+                self._host_ready.notify_all()
+    
+    @contextmanager
+    def page_connection(self, url, hedge=False):
+        """Holds a request slot for a page download, starting it once the host's delay has
+        passed; the delay restarts when the download is finished.
+        
+        A hedge duplicates a request that already holds a slot and has started, so it
+        reuses that slot and is sent right away instead of queueing behind the others.
+        """
+        with nullcontext() if hedge else self.host_connection(url, delayed=True):
+            if not hedge:
+                with self._host_ready:
+                    self._request_started[url] = time.monotonic()
+                    self._host_ready.notify_all()
+            try:
+                yield
+            finally:
+                # Counting the delay from the end of the download gives slow hosts more room,
+                # the jitter keeps workers waiting for the same host from firing in lockstep
+                host = parse_url(url).netloc
+                delay = self.host_delay(url)
+                next_ok = time.monotonic() + (delay + random.uniform(0, 0.1) if delay else 0)
+                with self._host_lock:
+                    self._host_next_ok[host] = max(self._host_next_ok.get(host, 0), next_ok)
+                    started = None if hedge else self._request_started.pop(url, None)
+                if started is not None:
+                    self.record_latency(url, time.monotonic() - started)
+    
+    def record_latency(self, url, seconds):
+        """Remembers how long a page download took, keeping the last 50 per host"""
+        host = parse_url(url).netloc
+        with self._host_lock:
+            self._page_requests += 1
+            latencies = self._host_latency.get(host)
+            if latencies is None:
+                latencies = self._host_latency[host] = deque(maxlen=50)
+            latencies.append(seconds)
+    
+    def hedge_threshold(self, url):
+        """Returns the 95th percentile download time of the URL's host, or None if too few were measured"""
+        with self._host_lock:
+            latencies = sorted(self._host_latency.get(parse_url(url).netloc, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[int(len(latencies) * 0.95)]
+    
+    def download_result(self, url, future):
+        """Waits for a page download; if it takes longer than its host usually needs,
+        a second request is sent and whichever finishes first is used"""
+        threshold = self.hedge_threshold(url)
+        if threshold is not None and not future.done():
+            # Time spent waiting for the host's delay doesn't count, wait until the request is sent
+            with self._host_ready:
+                while url not in self._request_started and not future.done():
+                    self._host_ready.wait(0.1)
+                started = self._request_started.get(url)
+            
+            # Hedge requests that are still running past the host's usual response time
+            remaining = started + threshold - time.monotonic() if started is not None else 0
+            hedge = started is not None and not wait([future], timeout=max(0, remaining)).done
+            if hedge:
+                with self._host_lock:
+                    hedge = self._hedged_requests * HEDGE_RATIO < self._page_requests
+                    if hedge:
+                        self._hedged_requests += 1
+            if hedge:
+                logger.info(f"Slow response, sending a second request: {url}")
+                hedged = self.hedge_executor.submit(self.download_page, url, True)
+                done, _ = wait([future, hedged], return_when=FIRST_COMPLETED)
+                first, other = (future, hedged) if future in done else (hedged, future)
+                # A request that failed fast (None) doesn't decide, the other one may still succeed
+                if first.exception() is None and first.result() is not None:
+                    other.cancel()
+                    return first.result()
+                future = other
+        
+        return future.result()
+    
+    def is_valid_url(self, url, from_url=None):
         """Checks if a URL is valid and belongs to the same documentation area"""
-        parsed = urlparse(url)
+        parsed = parse_url(url)
         
         # Only URLs to the same domain
         if parsed.netloc and parsed.netloc != self.domain:
@@ -150,11 +663,14 @@ class WebToPdfConverter:
             return False
             
         # No anchor links or query parameters
-        if "#" in url:
-            url = url.split("#")[0]
+        url = url.partition("#")[0]
             
         # No files that aren't HTML (like PDFs, images, JSON, etc.)
-        if path.endswith(('.pdf', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.zip', '.exe', '.json', '.xml', '.js', '.css')):
+        if path.endswith(SKIPPED_EXTENSIONS):
+            return False
+        
+        # No pages robots.txt disallows, if requested
+        if self.options['respect_robots'] and not self.robots_rules(url).can_fetch(self.session.headers['User-Agent'], url):
             return False
         
         # Check depth limitation, if set
@@ -169,13 +685,36 @@ class WebToPdfConverter:
         return True
     
     def extract_links(self, soup, current_url):
-        """Extracts all links from a page"""
+        """Extracts all links from a parsed page"""
+        return self.collect_links((a_tag['href'] for a_tag in soup.find_all('a', href=True)), current_url)
+    
+    def page_links(self, html_content, current_url):
+        """Extracts all links from raw HTML, with selectolax when available"""
+        if LexborHTMLParser:
+            hrefs = (a_tag.attributes['href'] or '' for a_tag in LexborHTMLParser(html_content).css('a[href]'))
+        else:
+            hrefs = (a_tag['href'] for a_tag in BeautifulSoup(html_content, HTML_PARSER).find_all('a', href=True))
+        return self.collect_links(hrefs, current_url)
+    
+    def page_text(self, html_content):
+        """Returns the text of raw HTML, with selectolax when available"""
+        if LexborHTMLParser:
+            # Like BeautifulSoup's get_text(), leave out the contents of scripts and style sheets
+            tree = LexborHTMLParser(html_content)
+            tree.strip_tags(['script', 'style'])
+            return tree.text()
+        return BeautifulSoup(html_content, HTML_PARSER).get_text()
+    
+    def collect_links(self, hrefs, current_url):
+        """Resolves link targets against the current page and keeps the ones to crawl"""
         links = []
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            absolute_url = urljoin(current_url, href)
+        is_valid_url = self.is_valid_url
+        visited_urls = self.visited_urls
+        for href in hrefs:
+            # Canonicalize, so page.html, page.html#section and page.html?utm_source=x are the same page
+            absolute_url = canonical_url(urljoin(current_url, href))
             
-            if self.is_valid_url(absolute_url, current_url) and absolute_url not in self.visited_urls:
+            if absolute_url not in visited_urls and is_valid_url(absolute_url, current_url):
                 links.append(absolute_url)
                 
         return links
@@ -184,32 +723,42 @@ class WebToPdfConverter:
         """Downloads an image and saves it temporarily"""
         try:
             absolute_url = urljoin(base_url, img_url)
-            response = requests.get(absolute_url, stream=True, timeout=self.options['timeout'])
-            response.raise_for_status()
-            
-            img_data = response.content
+            with self.host_connection(absolute_url), \
+                    self.session.get(absolute_url, stream=True, timeout=self.options['timeout']) as response:
+                response.raise_for_status()
+                
+                # Read the body in chunks so oversized images are dropped early
+                buffer = io.BytesIO()
+                for chunk in response.iter_content(64 * 1024):
+                    buffer.write(chunk)
+                    if buffer.tell() > MAX_IMAGE_SIZE:
+                        raise ValueError(f"image larger than {MAX_IMAGE_SIZE // (1024 * 1024)} MB")
+                img_data = buffer.getvalue()
+                
+                # Check if it's an SVG image
+                is_svg = img_url.lower().endswith('.svg') or 'image/svg+xml' in response.headers.get('Content-Type', '').lower()
             
-            # Check if it's an SVG image
-            is_svg = img_url.lower().endswith('.svg') or 'image/svg+xml' in response.headers.get('Content-Type', '').lower()
+            extension = None if is_svg else guess_image_extension(img_data[:12])
             
-            if is_svg:
+            if extension and len(img_data) < MAX_PASSTHROUGH_SIZE:
+                # Supported format: keep the original bytes, no decode/encode round trip
+                img_path = self.new_image_path(extension)
+                with open(img_path, 'wb') as f:
+                    f.write(img_data)
+            elif is_svg:
                 # For SVG files, create a simple PNG placeholder
                 # Alternatively, install cairosvg with: pip install cairosvg
-                img_path = os.path.join(self.temp_dir, f"img_{self.image_counter}.png")
-                self.image_counter += 1
                 
                 # Create a blank image for SVG placeholder
+                img_path = self.new_image_path()
                 placeholder = PILImage.new('RGB', (300, 100), color=(240, 240, 240))
                 from PIL import ImageDraw
                 draw = ImageDraw.Draw(placeholder)
                 draw.text((10, 40), f"SVG Image: {os.path.basename(img_url)}", fill=(0, 0, 0))
                 placeholder.save(img_path, "PNG")
             else:
-                # Process normal image
-                img_path = os.path.join(self.temp_dir, f"img_{self.image_counter}.png")
-                self.image_counter += 1
-                
-                # Convert and save the image
+                # Any other format: convert it to PNG
+                img_path = self.new_image_path()
                 img = PILImage.open(io.BytesIO(img_data))
                 img.save(img_path, "PNG")
             
@@ -218,28 +767,52 @@ class WebToPdfConverter:
             logger.error(f"Error downloading image {img_url}: {e}")
             return None
     
-    def check_content_filters(self, soup, url):
+    def new_image_path(self, extension='.png'):
+        """Reserves a unique file name in the temp directory (safe to call from worker threads)"""
+        with self._image_lock:
+            img_path = os.path.join(self.temp_dir, f"img_{self.image_counter}{extension}")
+            self.image_counter += 1
+        return img_path
+    
+    def download_images(self, img_srcs, base_url):
+        """Downloads all images of a page concurrently, each unique URL only once per run"""
+        absolute_urls = {src: urljoin(base_url, src) for src in img_srcs}
+        missing = [u for u in dict.fromkeys(absolute_urls.values()) if u not in self.img_cache]
+        
+        for img_url, img_path in zip(missing, self.image_executor.map(self.download_image, missing, repeat(base_url))):
+            self.img_cache[img_url] = img_path
+            
+        return {src: self.img_cache[img_url] for src, img_url in absolute_urls.items()}
+    
+    def check_content_filters(self, url, html_content):
         """Checks if the content meets the filter criteria"""
         # If no filters are set, accept everything
-        if not self.options['contains'] and not self.options['not_contains']:
+        if not self._keyword_scanner:
             return True
             
-        # Get all text from the page
-        page_text = soup.get_text().lower()
+        # Cheap check on the raw HTML with the markup removed and entities decoded
+        # (Gr&ouml;&szlig;e is Größe, <code>API</code> reference is "API reference"),
+        # which is close to the page text. The text itself is only extracted by the
+        # parser when a keyword does occur, to confirm the match.
+        has_required, has_excluded = self._keyword_scanner(html.unescape(MARKUP_RE.sub('', html_content)).lower())
         
         # Check "contains" filter
-        if self.options['contains']:
-            contains_keywords = [k.lower().strip() for k in self.options['contains'].split(',')]
-            if not any(keyword in page_text for keyword in contains_keywords):
-                logger.info(f"Page doesn't contain any of the required keywords: {url}")
-                return False
+        if self._contains_keywords and not has_required:
+            logger.info(f"Page doesn't contain any of the required keywords: {url}")
+            return False
+        
+        if not self._contains_keywords and not has_excluded:
+            return True
+        
+        has_required, has_excluded = self._keyword_scanner(self.page_text(html_content).lower())
+        if self._contains_keywords and not has_required:
+            logger.info(f"Page doesn't contain any of the required keywords: {url}")
+            return False
                 
         # Check "not_contains" filter
-        if self.options['not_contains']:
-            not_contains_keywords = [k.lower().strip() for k in self.options['not_contains'].split(',')]
-            if any(keyword in page_text for keyword in not_contains_keywords):
-                logger.info(f"Page contains excluded keywords: {url}")
-                return False
+        if has_excluded:
+            logger.info(f"Page contains excluded keywords: {url}")
+            return False
                 
         return True
     
@@ -260,55 +833,143 @@ class WebToPdfConverter:
                 
         return None
     
-    def parse_sitemap(self, sitemap_url=None):
-        """Parses the sitemap and extracts URLs"""
-        if not sitemap_url:
-            # Try to find standard sitemap paths
+    def fetch_robots_txt(self, origin):
+        """Returns the robots.txt of an origin (scheme://host), or '' if it has none"""
+        # Locked, so download workers asking for the same origin wait for a single request
+        with self._robots_lock:
+            if origin not in self._robots_txt:
+                try:
+                    response = self.session.get(f"{origin}/robots.txt", timeout=self.options['timeout'])
+                    self._robots_txt[origin] = response.text if response.status_code == 200 else ''
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"Could not load {origin}/robots.txt: {e}")
+                    self._robots_txt[origin] = ''
+            return self._robots_txt[origin]
+    
+    def robots_rules(self, url):
+        """Returns the parsed robots.txt for the URL's origin"""
+        parsed = parse_url(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        rules = self._robots_rules.get(origin)
+        if rules is None:
+            rules = RobotFileParser()
+            rules.parse(self.fetch_robots_txt(origin).splitlines())
+            self._robots_rules[origin] = rules
+        return rules
+    
+    def discover_sitemaps(self):
+        """Finds the site's sitemaps: robots.txt, the standard locations, then <link rel="sitemap">"""
+        parsed = parse_url(self.base_url)
+        if parsed.netloc in self._sitemap_cache:
+            return self._sitemap_cache[parsed.netloc]
+        
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        
+        # The start URL may already be the sitemap
+        if parsed.path.endswith(('.xml', '.xml.gz')):
+            sitemap_urls = [self.base_url]
+        else:
+            # 1. Sitemap directives in robots.txt
+            sitemap_urls = SITEMAP_DIRECTIVE_RE.findall(self.fetch_robots_txt(origin))
+        
+        # 2. Standard locations, in the documentation area first
+        if not sitemap_urls:
             sitemap_candidates = [
-                f"{self.base_url}/sitemap.xml",
-                f"https://{self.domain}/sitemap.xml",
-                f"https://{self.domain}/sitemap_index.xml"
+                f"{origin}{self.base_path}sitemap.xml",
+                f"{origin}/sitemap.xml",
+                f"{origin}/sitemap_index.xml"
             ]
-            
-            for candidate in sitemap_candidates:
+            for candidate in dict.fromkeys(sitemap_candidates):
                 try:
-                    response = requests.get(candidate, timeout=self.options['timeout'])
-                    if response.status_code == 200:
-                        sitemap_url = candidate
-                        break
-                except:
+                    # Only the status is needed, the body is left unread
+                    with self.session.get(candidate, stream=True, timeout=self.options['timeout']) as response:
+                        if response.status_code == 200:
+                            sitemap_urls = [candidate]
+                            break
+                except requests.exceptions.RequestException:
                     continue
-                    
+        
+        # 3. <link rel="sitemap"> on the start page
+        if not sitemap_urls:
+            html_content = self.download_page(self.base_url)
+            if html_content:
+                link = BeautifulSoup(html_content, HTML_PARSER).find('link', rel='sitemap', href=True)
+                if link:
+                    sitemap_urls = [urljoin(self.base_url, link['href'])]
+        
+        if sitemap_urls:
+            logger.info(f"Found sitemap(s): {', '.join(sitemap_urls)}")
+        self._sitemap_cache[parsed.netloc] = sitemap_urls
+        return sitemap_urls
+    
+    def parse_sitemap(self, sitemap_url=None, limit=None):
+        """Parses the sitemap and extracts up to max_pages URLs"""
+        if limit is None:
+            limit = self.options['max_pages']
+        
         if not sitemap_url:
-            logger.error("No sitemap found.")
-            return []
+            sitemap_urls = self.discover_sitemaps()
+            if not sitemap_urls:
+                logger.error("No sitemap found.")
+                return []
+            
+            urls = []
+            for discovered_url in sitemap_urls:
+                if len(urls) >= limit:
+                    break
+                urls.extend(self.parse_sitemap(discovered_url, limit - len(urls)))
+            return urls
             
         try:
             logger.info(f"Loading sitemap: {sitemap_url}")
-            response = requests.get(sitemap_url, timeout=self.options['timeout'])
-            response.raise_for_status()
+            urls = []
+            nested_sitemaps = []
             
-            # Try to use lxml-xml parser, fall back to html.parser if not available
-            try:
-                soup = BeautifulSoup(response.text, 'lxml-xml')
-            except:
-                soup = BeautifulSoup(response.text, 'html.parser')
+            with self.session.get(sitemap_url, stream=True, timeout=self.options['timeout']) as response:
+                response.raise_for_status()
                 
-            urls = []
+                # Parse straight from the connection instead of loading the whole file;
+                # sitemaps may be gzip-compressed files (sitemap.xml.gz)
+                response.raw.decode_content = True
+                response.raw.auto_close = False  # BufferedReader reads past the end
+                source = io.BufferedReader(response.raw)
+                if source.peek(2)[:2] == b'\x1f\x8b':
+                    source = gzip.GzipFile(fileobj=source)
+                
+                # Stream through the XML, handling each <url>/<sitemap> entry as soon as it is
+                # complete and clearing it afterwards, instead of building the whole tree
+                try:
+                    for _, element in etree.iterparse(source, events=('end',)):
+                        entry_type = element.tag.rpartition('}')[2]
+                        if entry_type not in ('url', 'sitemap'):
+                            continue
+                        
+                        loc = next((child.text for child in element if child.tag.rpartition('}')[2] == 'loc'), None)
+                        element.clear()
+                        # lxml keeps cleared entries attached to the root, release those as well
+                        if hasattr(element, 'getprevious'):
+                            while element.getprevious() is not None:
+                                del element.getparent()[0]
+                        if not loc:
+                            continue
+                        
+                        loc = loc.strip()
+                        if entry_type == 'sitemap':
+                            # Sitemap index: links to other sitemaps
+                            nested_sitemaps.append(loc)
+                        else:
+                            loc = canonical_url(loc)
+                            if self.is_valid_url(loc):
+                                urls.append(loc)
+                                if len(urls) >= limit:
+                                    break
+                except etree.ParseError as e:
+                    logger.warning(f"Sitemap {sitemap_url} is not well-formed, keeping the {len(urls)} URLs read so far: {e}")
             
-            # Process sitemap index (contains links to other sitemaps)
-            sitemapindex = soup.find('sitemapindex')
-            if sitemapindex:
-                for sitemap in sitemapindex.find_all('sitemap'):
-                    loc = sitemap.find('loc')
-                    if loc:
-                        urls.extend(self.parse_sitemap(loc.text))
-            else:
-                # Process normal sitemap
-                for url in soup.find_all('url'):
-                    loc = url.find('loc')
-                    if loc and self.is_valid_url(loc.text):
-                        urls.append(loc.text)
+            for nested_sitemap in nested_sitemaps:
+                if len(urls) >= limit:
+                    break
+                urls.extend(self.parse_sitemap(nested_sitemap, limit - len(urls)))
                         
             return urls
             
@@ -316,19 +977,20 @@ class WebToPdfConverter:
             logger.error(f"Error parsing sitemap: {e}")
             return []
             
-    def process_page(self, url):
-        """Processes a single page and extracts content for the PDF"""
-        html_content = self.download_page(url)
+    def process_page(self, url, html_content=None):
+        """Processes a single page: stores its content and returns its PDF flowables (PDF format only)"""
+        if html_content is None:
+            html_content = self.download_page(url)
         if not html_content:
             return []
         
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Check content filter
-            if not self.check_content_filters(soup, url):
+            # Check content filter before building the full tree, rejected pages never need it
+            if not self.check_content_filters(url, html_content):
                 return []
-                
+            
+            soup = BeautifulSoup(html_content, HTML_PARSER)
+            
             # Check category filter
             if self.options['categories']:
                 page_category = self.get_category(soup)
@@ -352,76 +1014,82 @@ class WebToPdfConverter:
                 logger.warning(f"No main content found in: {url}")
                 return []
             
-            # Store page content for non-PDF formats
-            self.contents[url] = {
-                'title': soup.title.string if soup.title else url.split('/')[-1],
-                'html': str(main_content),
-                'text': main_content.get_text(),
-                'url': url
-            }
-            
-            # Add page title
-            title = soup.title.string if soup.title else url.split('/')[-1]
-            elements = [
-                Paragraph(f"<b>{title}</b>", ParagraphStyle('Title', fontSize=16, spaceAfter=12)),
-                Paragraph(f"Source: {url}", ParagraphStyle('URL', fontSize=8, textColor=colors.gray, spaceAfter=12))
-            ]
+            # A plain str: a NavigableString would keep the whole parsed page alive through .parent.
+            # .string is None for an empty <title> or one with nested tags.
+            title = soup.title.string if soup.title else None
+            title = str(title) if title is not None else url.split('/')[-1]
             
-            # Styles for various elements
-            styles = getSampleStyleSheet()
-            header_style = ParagraphStyle('Header', fontSize=14, spaceAfter=8, spaceBefore=12)
-            text_style = ParagraphStyle('Text', fontSize=10, spaceAfter=8, leading=14)
-            code_style = ParagraphStyle('Code', fontName='Courier', fontSize=8, spaceAfter=8, 
-                                       backColor=colors.lightgrey, borderWidth=1, borderColor=colors.lightgrey,
-                                       borderPadding=5, leading=12)
+            # Store page content for non-PDF formats, only in the form the exporter reads
+            output_format = self.options['format'].lower()
+            if output_format != 'pdf':
+                entry = {'title': title, 'url': url}
+                if output_format in HTML_FORMATS:
+                    entry['html'] = str(main_content)
+                if output_format in TEXT_FORMATS:
+                    entry['text'] = main_content.get_text()
+                self.contents[url] = entry
             
             # Extract links for further visits, if not in sitemap mode
             if not self.options['use_sitemap']:
                 new_links = self.extract_links(soup, url)
                 for link in new_links:
-                    if link not in self.visited_urls and link not in self.to_visit:
-                        self.to_visit.append(link)            # Process elements of the main content
-            for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'code', 'img', 'div']):
+                    if link not in self.queued_urls and link not in self.visited_urls:
+                        self.to_visit.append(link)
+                        self.queued_urls.add(link)
+            
+            # Only the PDF output needs flowables (and the images they embed)
+            if output_format != 'pdf':
+                return []
+            
+            # Add page title
+            elements = [
+                Paragraph(f"<b>{title}</b>", self._style_title),
+                Paragraph(f"Source: {url}", self._style_url)
+            ]
+            
+            # Process elements of the main content in a single walk over the tree
+            for element in main_content.descendants:
+                name = element.name
+                if name not in CONTENT_TAGS:
+                    continue
+                
                 # Headings
-                if element.name in ['h1', 'h2', 'h3', 'h4']:
+                if name in ('h1', 'h2', 'h3', 'h4'):
                     text = element.text.strip()
                     if text:
-                        elements.append(Paragraph(text, header_style))
+                        elements.append(Paragraph(text, self._style_header))
                 
                 # Paragraphs
-                elif element.name == 'p':
+                elif name == 'p':
                     text = element.text.strip()
                     if text:
-                        elements.append(Paragraph(text, text_style))
+                        elements.append(Paragraph(text, self._style_text))
                 
                 # Code blocks
-                elif element.name == 'pre' or (element.name == 'div' and 'code' in element.get('class', [])):
+                elif name == 'pre' or (name == 'div' and 'code' in element.get('class', [])):
                     code_text = element.text.strip()
                     if code_text:
-                        elements.append(Preformatted(code_text, code_style))
+                        elements.append(Preformatted(code_text, self._style_code))
                 
                 # Inline code
-                elif element.name == 'code' and element.parent.name != 'pre':
+                elif name == 'code' and element.parent.name != 'pre':
                     code_text = element.text.strip()
                     if code_text:
-                        elements.append(Preformatted(code_text, code_style))
-                
-                # Images
-                elif element.name == 'img' and element.get('src'):
-                    img_path = self.download_image(element['src'], url)
-                    if img_path:
-                        try:
-                            img = Image(img_path)
-                            # Limit image size
-                            max_width = 450
-                            if img.drawWidth > max_width:
-                                ratio = max_width / img.drawWidth
-                                img.drawWidth = max_width
-                                img.drawHeight *= ratio
-                            elements.append(img)
-                            elements.append(Spacer(1, 6))
-                        except Exception as e:
-                            logger.error(f"Error adding image to PDF: {e}")
+                        elements.append(Preformatted(code_text, self._style_code))
+                
+                # Images: keep the source as a placeholder, they are downloaded together below
+                elif name == 'img' and element.get('src'):
+                    elements.append(element['src'])
+            
+            # Download the page's images in parallel and put them in place of their placeholders
+            images = self.download_images([e for e in elements if isinstance(e, str)], url)
+            flowables = []
+            for element in elements:
+                if isinstance(element, str):
+                    flowables.extend(self.image_flowables(images[element]))
+                else:
+                    flowables.append(element)
+            elements = flowables
             
             # Add a page break at the end
             elements.append(PageBreak())
@@ -432,6 +1100,24 @@ class WebToPdfConverter:
             logger.error(f"Error processing page {url}: {e}")
             return []
     
+    def image_flowables(self, img_path):
+        """Returns the flowables for a downloaded image, scaled to fit the page width"""
+        if not img_path:
+            return []
+        
+        try:
+            img = Image(img_path)
+            # Limit image size
+            max_width = 450
+            if img.drawWidth > max_width:
+                ratio = max_width / img.drawWidth
+                img.drawWidth = max_width
+                img.drawHeight *= ratio
+            return [img, Spacer(1, 6)]
+        except Exception as e:
+            logger.error(f"Error adding image to PDF: {e}")
+            return []
+    
     def interactive_mode(self):
         """Allows user to interactively select which URLs to process"""
         if self.options['use_sitemap']:
@@ -440,11 +1126,12 @@ class WebToPdfConverter:
         else:
             # First, crawl the site to discover URLs without processing them
             temp_visited = set()
-            to_visit = [self.base_url]
+            to_visit = deque([self.base_url])
+            queued = {self.base_url}
             discovered_urls = []
             
             while to_visit and len(temp_visited) < self.options['max_pages']:
-                current_url = to_visit.pop(0)
+                current_url = to_visit.popleft()
                 if current_url in temp_visited:
                     continue
                 
@@ -453,14 +1140,12 @@ class WebToPdfConverter:
                 
                 html_content = self.download_page(current_url)
                 if html_content:
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    new_links = self.extract_links(soup, current_url)
+                    new_links = self.page_links(html_content, current_url)
                     
                     for link in new_links:
-                        if link not in temp_visited and link not in to_visit:
+                        if link not in queued and link not in temp_visited:
                             to_visit.append(link)
-                
-                time.sleep(self.options['delay'])
+                            queued.add(link)
             
             urls = discovered_urls
         
@@ -489,9 +1174,11 @@ class WebToPdfConverter:
         
         return selected_urls
     
-    def create_pdf(self):
-        """Creates a PDF from the collected elements"""
-        if not self.pdf_elements:
+    def create_pdf(self, flowables):
+        """Creates a PDF from the given flowables"""
+        # reportlab consumes the flowables from a list while laying out the document
+        flowables = list(flowables)
+        if not flowables:
             logger.error("No content to create PDF.")
             return False
         
@@ -509,10 +1196,9 @@ class WebToPdfConverter:
                 ]
                 
                 # Add TOC at the beginning
-                self.pdf_elements.insert(0, toc)
-                self.pdf_elements.insert(1, PageBreak())
+                flowables[0:0] = [toc, PageBreak()]
             
-            doc.build(self.pdf_elements)
+            doc.build(flowables)
             logger.info(f"PDF created: {self.output_path}")
             return True
             
@@ -520,37 +1206,52 @@ class WebToPdfConverter:
             logger.error(f"Error creating PDF: {e}")
             return False
     
+    def write_output(self, parts):
+        """Writes the output file from its parts through a 1 MB buffer, without joining them in memory first"""
+        with open(self.output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.writelines(parts)
+    
     def create_html(self):
         """Creates an HTML file from the collected content"""
         try:
-            with open(self.output_path, 'w', encoding='utf-8') as f:
-                f.write('<!DOCTYPE html>\n<html>\n<head>\n')
-                f.write('<meta charset="UTF-8">\n')
-                f.write(f'<title>Documentation: {self.base_url}</title>\n')
-                f.write('<style>\n')
-                f.write('body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }\n')
-                f.write('h1 { color: #333; }\n')
-                f.write('pre { background-color: #f5f5f5; padding: 10px; border-radius: 5px; }\n')
-                f.write('.source { color: #666; font-size: 0.8em; margin-bottom: 20px; }\n')
-                f.write('</style>\n')
-                f.write('</head>\n<body>\n')
-                
-                # Add table of contents
-                if self.options['create_toc'] and self.contents:
-                    f.write('<h2>Table of Contents</h2>\n<ul>\n')
-                    for url, content in self.contents.items():
-                        f.write(f'<li><a href="#{url.split("//")[1].replace("/", "_")}">{content["title"]}</a></li>\n')
-                    f.write('</ul>\n<hr>\n')
-                
-                # Add content of each page
-                for url, content in self.contents.items():
-                    f.write(f'<div id="{url.split("//")[1].replace("/", "_")}">\n')
-                    f.write(f'<h1>{content["title"]}</h1>\n')
-                    f.write(f'<div class="source">Source: <a href="{url}">{url}</a></div>\n')
-                    f.write(content['html'])
-                    f.write('\n<hr>\n</div>\n')
-                
-                f.write('</body>\n</html>')
+            parts = [
+                '<!DOCTYPE html>\n<html>\n<head>\n'
+                '<meta charset="UTF-8">\n'
+                f'<title>Documentation: {self.base_url}</title>\n'
+                '<style>\n'
+                'body { font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }\n'
+                'h1 { color: #333; }\n'
+                'pre { background-color: #f5f5f5; padding: 10px; border-radius: 5px; }\n'
+                '.source { color: #666; font-size: 0.8em; margin-bottom: 20px; }\n'
+                '</style>\n'
+                '</head>\n<body>\n'
+            ]
+            
+            # Build the table of contents and the page bodies in a single pass
+            toc_parts = []
+            body_parts = []
+            for url, content in self.contents.items():
+                # Anchor ids are derived from the URL
+                anchor = url.partition("//")[2].translate(URL_ANCHOR_TABLE)
+                toc_parts.append(f'<li><a href="#{anchor}">{content["title"]}</a></li>\n')
+                body_parts.append(
+                    f'<div id="{anchor}">\n'
+                    f'<h1>{content["title"]}</h1>\n'
+                    f'<div class="source">Source: <a href="{url}">{url}</a></div>\n'
+                    f'{content["html"]}\n<hr>\n</div>\n'
+                )
+            
+            # Add table of contents
+            if self.options['create_toc'] and toc_parts:
+                parts.append('<h2>Table of Contents</h2>\n<ul>\n')
+                parts.extend(toc_parts)
+                parts.append('</ul>\n<hr>\n')
+            
+            # Add content of each page
+            parts.extend(body_parts)
+            parts.append('</body>\n</html>')
+            
+            self.write_output(parts)
                 
             logger.info(f"HTML created: {self.output_path}")
             return True
@@ -574,8 +1275,12 @@ class WebToPdfConverter:
                     'text': content['text']
                 })
                 
-            with open(self.output_path, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2)
+            if orjson:
+                with open(self.output_path, 'wb') as f:
+                    f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+            else:
+                with open(self.output_path, 'w', encoding='utf-8') as f:
+                    json.dump(output, f, indent=2)
                 
             logger.info(f"JSON created: {self.output_path}")
             return True
@@ -587,37 +1292,42 @@ class WebToPdfConverter:
     def create_markdown(self):
         """Creates a Markdown file from the collected content"""
         try:
-            with open(self.output_path, 'w', encoding='utf-8') as f:
-                # Write title
-                f.write(f"# Documentation: {self.base_url}\n\n")
-                
-                # Add table of contents if requested
-                if self.options['create_toc'] and self.contents:
-                    f.write("## Table of Contents\n\n")
-                    for url, content in self.contents.items():
-                        # Create a clean anchor name from the title
-                        anchor = content['title'].lower().replace(' ', '-').replace(':', '').replace('.', '')
-                        f.write(f"- [{content['title']}](#{anchor})\n")
-                    f.write("\n---\n\n")
-                
-                # Add content of each page
-                for url, content in self.contents.items():
-                    # Create a clean anchor name from the title
-                    anchor = content['title'].lower().replace(' ', '-').replace(':', '').replace('.', '')
-                    f.write(f"## {content['title']} <a id=\"{anchor}\"></a>\n\n")
-                    f.write(f"Source: [{url}]({url})\n\n")
-                    
-                    # Convert HTML content to Markdown-friendly text
-                    # This is a simple approach, consider using html2text for better conversion
-                    text = content['text']
-                    
-                    # Process text to make it more markdown-friendly
-                    # Split into paragraphs and add line breaks
-                    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+            # Build the table of contents and the page bodies in a single pass
+            toc_parts = []
+            body_parts = []
+            for url, content in self.contents.items():
+                # Create a clean anchor name from the title
+                anchor = content['title'].lower().translate(ANCHOR_TABLE)
+                toc_parts.append(f"- [{content['title']}](#{anchor})\n")
+                body_parts.append(f"## {content['title']} <a id=\"{anchor}\"></a>\n\n")
+                body_parts.append(f"Source: [{url}]({url})\n\n")
+                
+                if html2text:
+                    # Convert the HTML content, keeping headings, lists, code and links
+                    converter = html2text.HTML2Text(baseurl=url, bodywidth=0)
+                    converter.ignore_images = False
+                    body_parts.append(f"{converter.handle(content['html']).strip()}\n\n")
+                else:
+                    # Fallback: split the plain text into paragraphs
+                    paragraphs = [p.strip() for p in content['text'].split('\n\n') if p.strip()]
                     for p in paragraphs:
-                        f.write(f"{p}\n\n")
-                    
-                    f.write("---\n\n")
+                        body_parts.append(f"{p}\n\n")
+                
+                body_parts.append("---\n\n")
+            
+            # Write title
+            parts = [f"# Documentation: {self.base_url}\n\n"]
+            
+            # Add table of contents if requested
+            if self.options['create_toc'] and toc_parts:
+                parts.append("## Table of Contents\n\n")
+                parts.extend(toc_parts)
+                parts.append("\n---\n\n")
+            
+            # Add content of each page
+            parts.extend(body_parts)
+            
+            self.write_output(parts)
                 
             logger.info(f"Markdown created: {self.output_path}")
             return True
@@ -664,42 +1374,67 @@ class WebToPdfConverter:
             logger.error(f"Error creating DOCX: {e}")
             return False
     
-    def run(self):
-        """Main execution flow of the converter"""
-        logger.info(f"Starting conversion of {self.base_url} to {self.options['format']}")
-        
-        # Use sitemap if requested
-        if self.options['use_sitemap']:
-            logger.info("Using sitemap for URL discovery")
-            urls = self.parse_sitemap(self.options['sitemap_url'])
-            self.to_visit = urls
-        
-        # Interactive mode
-        if self.options['interactive']:
-            logger.info("Running in interactive mode")
-            self.to_visit = self.interactive_mode()
+    def crawl(self):
+        """Visits the queued pages and yields the PDF flowables of each page as it is processed"""
+        # Downloads run concurrently on the worker pool, pages are processed
+        # in crawl order as they complete. Twice as many downloads as workers are
+        # queued, so the pool keeps working while a slow page holds up processing.
+        max_pending = 2 * max(1, self.options['workers'])
+        pending = deque()
+        processed = 0
         
-        # Main crawling and processing loop
-        while self.to_visit and len(self.visited_urls) < self.options['max_pages']:
-            current_url = self.to_visit.pop(0)
-            
-            if current_url in self.visited_urls:
-                continue
+        self.open_state()
+        finished = False
+        try:
+            while self.to_visit or pending:
+                # Keep the worker pool busy with the next URLs in the queue
+                while (self.to_visit and len(pending) < max_pending
+                       and len(self.visited_urls) < self.options['max_pages']):
+                    next_url = self.to_visit.popleft()
+                    if next_url in self.visited_urls:
+                        continue
+                    self.visited_urls.add(next_url)
+                    
+                    # Pages an interrupted run already downloaded are replayed from the resume log
+                    stored = self.stored_page(next_url)
+                    if stored is not None:
+                        future = Future()
+                        future.set_result(stored)
+                        pending.append((next_url, future, True))
+                    else:
+                        pending.append((next_url, self.executor.submit(self.download_page, next_url), False))
                 
-            logger.info(f"Processing {len(self.visited_urls) + 1}/{self.options['max_pages']}: {current_url}")
-            self.visited_urls.add(current_url)
-            
-            elements = self.process_page(current_url)
-            if elements:
-                self.pdf_elements.extend(elements)
+                if not pending:
+                    break
                 
-            # Respect the delay between requests
-            time.sleep(self.options['delay'])
-        
-        # Create the requested output format
+                current_url, future, resumed = pending.popleft()
+                processed += 1
+                logger.info(f"Processing {processed}/{self.options['max_pages']}: {current_url}")
+                
+                html_content = self.download_result(current_url, future)
+                if html_content and not resumed:
+                    self.store_page(current_url, html_content)
+                yield self.process_page(current_url, html_content or '')
+            finished = True
+        finally:
+            self.close_state(finished)
+    
+    def iter_flowables(self):
+        """Yields the flowables of all crawled pages in order"""
+        for elements in self.crawl():
+            yield from elements
+    
+    def create_output(self):
+        """Crawls the pages and creates the requested output format"""
+        # The PDF is built from the flowables as the pages are crawled,
+        # the other formats from self.contents
         if self.options['format'].lower() == 'pdf':
-            return self.create_pdf()
-        elif self.options['format'].lower() == 'html':
+            return self.create_pdf(self.iter_flowables())
+        
+        for _ in self.crawl():
+            pass
+        
+        if self.options['format'].lower() == 'html':
             return self.create_html()
         elif self.options['format'].lower() == 'json':
             return self.create_json()
@@ -710,6 +1445,35 @@ class WebToPdfConverter:
         else:
             logger.error(f"Unsupported format: {self.options['format']}")
             return False
+    
+    def run(self):
+        """Main execution flow of the converter"""
+        logger.info(f"Starting conversion of {self.base_url} to {self.options['format']}")
+        
+        try:
+            # Use sitemap if requested
+            if self.options['use_sitemap']:
+                logger.info("Using sitemap for URL discovery")
+                urls = self.parse_sitemap(self.options['sitemap_url'])
+                self.to_visit = deque(urls)
+                self.queued_urls = set(urls)
+            
+            # Interactive mode
+            if self.options['interactive']:
+                logger.info("Running in interactive mode")
+                self.to_visit = deque(self.interactive_mode())
+                self.queued_urls = set(self.to_visit)
+            
+            return self.create_output()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.image_executor.shutdown(wait=False, cancel_futures=True)
+            self.hedge_executor.shutdown(wait=False, cancel_futures=True)
+            self.session.close()
+            if self._cache is not None:
+                with self._cache_lock:
+                    self._cache.close()
+                    self._cache = None
 
 
 def main():
@@ -724,6 +1488,13 @@ def main():
     parser.add_argument("--max-pages", type=int, default=250, help="Maximum number of pages to process (default: 250)")
     parser.add_argument("--delay", type=float, default=1, help="Delay between requests in seconds (default: 1)")
     parser.add_argument("--timeout", type=int, default=10, help="Request timeout in seconds (default: 10)")
+    parser.add_argument("--workers", type=int, default=16, help="Number of concurrent downloads (default: 16)")
+    parser.add_argument("--max-per-host", type=int, default=4,
+                        help="Maximum number of simultaneous requests to one host (default: 4)")
+    parser.add_argument("--max-bytes", type=int, default=5 * 1024 * 1024,
+                        help="Skip pages larger than this many bytes (default: 5 MB)")
+    parser.add_argument("--respect-robots", action="store_true",
+                        help="Skip pages disallowed by robots.txt and honour its Crawl-delay")
     parser.add_argument("--contains", help="Only include pages containing these keywords (comma-separated)")
     parser.add_argument("--not-contains", help="Exclude pages containing these keywords (comma-separated)")
     parser.add_argument("--categories", help="Only include pages from these categories (comma-separated)")
@@ -731,6 +1502,15 @@ def main():
     parser.add_argument("--sitemap-url", help="URL of the sitemap (default: auto-detect)")
     parser.add_argument("--toc", action="store_true", help="Generate table of contents")
     parser.add_argument("--interactive", action="store_true", help="Interactive mode for URL selection")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Don't use the on-disk page cache")
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.expanduser('~'), '.cache', 'web_to_doc'),
+                        help="Directory of the page cache (default: ~/.cache/web_to_doc)")
+    parser.add_argument("--cache-ttl", type=float, default=24,
+                        help="Hours a cached page is used without asking the server again (default: 24)")
+    parser.add_argument("--resume", action=argparse.BooleanOptionalAction, default=True,
+                        help="Continue an interrupted run for the same output file without downloading "
+                             "its pages again (default: on; --no-resume starts over)")
     
     args = parser.parse_args()
     
@@ -746,6 +1526,10 @@ def main():
         'max_depth': args.max_depth,
         'delay': args.delay,
         'timeout': args.timeout,
+        'workers': args.workers,
+        'max_per_host': args.max_per_host,
+        'max_bytes': args.max_bytes,
+        'respect_robots': args.respect_robots,
         'format': args.format,
         'use_sitemap': args.use_sitemap,
         'sitemap_url': args.sitemap_url,
@@ -753,7 +1537,11 @@ def main():
         'not_contains': args.not_contains,
         'categories': args.categories,
         'create_toc': args.toc,
-        'interactive': args.interactive
+        'interactive': args.interactive,
+        'cache': args.cache,
+        'cache_dir': args.cache_dir,
+        'cache_ttl': args.cache_ttl,
+        'resume': args.resume
     }
     
     # Create and run the converter